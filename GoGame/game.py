@@ -1,8 +1,24 @@
 #!/usr/bin/env python3
 """Модуль реализует логику игры «Го»"""
 
-import collections
-import itertools
+import array
+import contextlib
+import functools
+
+# Смещения соседних точек: по сторонам и вместе с диагональными
+_DELTAS4 = ((1, 0), (0, 1), (-1, 0), (0, -1))
+_DELTAS8 = ((-1, -1), (-1, 0), (-1, 1), (0, -1),
+            (0, 1), (1, -1), (1, 0), (1, 1))
+
+# Символы точек поля в строковом представлении, индекс — состояние точки
+_POINT_CHARS = b'.X#O'
+_CODE_TO_CHAR = bytes.maketrans(bytes(range(len(_POINT_CHARS))),
+                                _POINT_CHARS)
+_CHAR_TO_CODE = bytes.maketrans(_POINT_CHARS,
+                                bytes(range(len(_POINT_CHARS))))
+_CHAR_TO_DIGIT = [
+    bytes(ord('1') if c == char else ord('0') for c in range(256))
+    for char in _POINT_CHARS]
 
 
 class Goban:
@@ -15,6 +31,22 @@ class Goban:
 
         self._size = cast_to_int(size)
 
+        (width, height) = self._size
+        self._full_mask = (1 << width * height) - 1
+        left_column = sum(1 << y * width for y in range(height))
+        self._not_left_mask = self._full_mask & ~left_column
+        self._not_right_mask = self._full_mask & ~(left_column << width - 1)
+
+        self._neighbours = self._get_adjacency(_DELTAS4)
+        self._next8 = self._get_adjacency(_DELTAS8)
+
+    def _get_adjacency(self, deltas):
+        """Таблица соседних точек для каждого бита поля"""
+        (width, height) = self._size
+        return [tuple((x + dx, y + dy) for (dx, dy) in deltas
+                      if 0 <= x + dx < width and 0 <= y + dy < height)
+                for y in range(height) for x in range(width)]
+
     @staticmethod
     def check_size(size):
         """Проверка параметров поля"""
@@ -40,6 +72,53 @@ class Goban:
 
         return all(0 <= int(x) < self._size[i] for (i, x) in enumerate(point))
 
+    def full_mask(self):
+        """Битовая маска всех точек поля"""
+        return self._full_mask
+
+    def point_to_bit(self, point):
+        """Номер бита, соответствующего точке поля"""
+        (x, y) = point
+        (width, height) = self._size
+        if not (0 <= x < width and 0 <= y < height):
+            raise ValueError('Wrong coordinates')
+
+        return y * width + x
+
+    def bit_to_point(self, bit):
+        """Точка поля, соответствующая номеру бита"""
+        return divmod(bit, self._size[0])[::-1]
+
+    def mask_to_bits(self, mask):
+        """Номера битов, входящих в битовую маску"""
+        while mask:
+            lsb = mask & -mask
+            mask ^= lsb
+            yield lsb.bit_length() - 1
+
+    def mask_to_points(self, mask):
+        """Точки поля, входящие в битовую маску"""
+        return map(self.bit_to_point, self.mask_to_bits(mask))
+
+    def shift_masks(self):
+        """Ширина поля и маски точек, не лежащих на левом и правом краях"""
+        return self._size[0], self._not_left_mask, self._not_right_mask
+
+    def expand(self, mask):
+        """Битовая маска соседей точек, входящих в маску"""
+        width = self._size[0]
+        return (((mask << 1) & self._not_left_mask)
+                | ((mask >> 1) & self._not_right_mask)
+                | ((mask << width) & self._full_mask)
+                | (mask >> width))
+
+    def expand_next(self, mask):
+        """Битовая маска точек маски и их соседей, включая диагональных"""
+        width = self._size[0]
+        row = (mask | ((mask << 1) & self._not_left_mask)
+               | ((mask >> 1) & self._not_right_mask))
+        return row | ((row << width) & self._full_mask) | (row >> width)
+
     def neighbour_points(self, point):
         """Соседние точки"""
         point = cast_to_int(point)
@@ -47,21 +126,16 @@ class Goban:
         if len(point) != len(self._size):
             raise ValueError('Wrong coordinates')
 
-        for delta in (1, 0), (0, 1), (-1, 0), (0, -1):
-            coords = tuple(map(sum, zip(point, delta)))
-            if self.check_coordinates(coords):
-                yield coords
+        return self._neighbours[self.point_to_bit(point)]
 
     def get_next_points(self, point):
+        """Соседние точки, включая диагональные"""
         point = cast_to_int(point)
 
         if len(point) != len(self._size):
             raise ValueError('Wrong coordinates')
 
-        for delta in itertools.product((-1, 0, 1), (-1, 0, 1)):
-            coords = tuple(map(sum, zip(point, delta)))
-            if any(delta) and self.check_coordinates(coords):
-                yield coords
+        return self._next8[self.point_to_bit(point)]
 
 
 class GameState:
@@ -83,11 +157,12 @@ class GameState:
             raise TypeError('Wrong type')
 
         self.goban = goban
-        self._state = collections.defaultdict(lambda: self.FREE)
-
-        for x in range(goban.size()[0]):
-            for y in range(goban.size()[1]):
-                self._state[(x, y)] = self.FREE
+        self._bb = [0] * (len(self.TURNS) + 1)
+        self._bb[self.FREE] = goban.full_mask()
+        self._points = array.array('b', [self.FREE]) * (
+            goban.size()[0] * goban.size()[1])
+        self._free_points = (0, frozenset())
+        self._liberties = {}
 
         self.dict_turns = {}
         self.get_turns_order()
@@ -100,14 +175,45 @@ class GameState:
         }
 
     def set_state(self, point, value):
-        self._state[point] = value
+        bit = self.goban.point_to_bit(point)
+        self._bb[self._points[bit]] &= ~(1 << bit)
+        self._bb[value] |= 1 << bit
+        self._points[bit] = value
+        self._liberties = {}
 
     def get_state(self, point):
-        """Состояние точки поля"""
-        return self._state[point]
+        """Состояние точки поля, точки вне поля считаются свободными"""
+        try:
+            return self._points[self.goban.point_to_bit(point)]
+        except ValueError:
+            return self.FREE
+
+    def snapshot(self):
+        """Снимок состояния поля"""
+        return tuple(self._bb), self._points[:], self._liberties
+
+    def restore(self, snapshot):
+        """Восстановление состояния поля из снимка"""
+        self._restore(snapshot, copy=True)
+
+    def _restore(self, snapshot, copy):
+        """Восстановление из снимка; без copy снимок больше не используется"""
+        (bb, points, self._liberties) = snapshot
+        self._bb = list(bb)
+        self._points = points[:] if copy else points
+
+    @contextlib.contextmanager
+    def speculative(self):
+        """Изменения поля внутри блока отменяются при выходе из него"""
+        snapshot = self.snapshot()
+        try:
+            yield self
+        finally:
+            self._restore(snapshot, copy=False)
 
     def get_full_state(self):
-        return self._state
+        return {self.goban.bit_to_point(bit): value
+                for (bit, value) in enumerate(self._points)}
 
     def get_goban_size(self):
         return self.goban.size()[0]
@@ -140,8 +246,8 @@ class GameState:
         if not self.goban.check_coordinates(point):
             raise ValueError('Wrong coordinates of point')
 
-        if self._state[point] == self.FREE:
-            self._state[point] = self._turn
+        if self.get_state(point) == self.FREE:
+            self.set_state(point, self._turn)
 
             self.check_for_suicide(point)
             taken_stones = self.take_stones(point)
@@ -154,63 +260,84 @@ class GameState:
     def check_for_suicide(self, point):
         """Проверка на самоубийство"""
         if self.count_liberties(point) == 0:
-            self._state[point] = self.FREE
+            self.set_state(point, self.FREE)
             raise ValueError('This move leads to suicide')
 
     def take_stones(self, point):
         """Поиск групп для захвата и подсчёт очков"""
         taken_stones = 0
-        for p in self.goban.neighbour_points(point):
-            if (self._state[p] != self._turn
-                    and self.count_liberties(p) == 0):
-                score = self.catch_group(p)
+
+        for neighbour in self.goban.neighbour_points(point):
+            mask = 1 << self.goban.point_to_bit(neighbour)
+            if mask & (self._bb[self._turn] | self._bb[self.FREE]):
+                continue
+
+            group, boarder = self._get_group_mask(mask)
+            if not boarder & self._bb[self.FREE]:
+                score = self._remove_group(group)
                 self.increase_score(score)
                 taken_stones += score
         return taken_stones
 
     def take_territory(self, colour):
-        visited = []
+        """Подсчёт территории, окружённой камнями заданного цвета"""
+        free = self._bb[self.FREE]
         score = 0
 
-        for point in self.get_free_points():
-            if point not in visited:
-                group, boarder = self.get_group(point)
-
-                for p in group:
-                    visited.append(p)
+        while free:
+            group, boarder = self._get_group_mask(free & -free)
+            free &= ~group
 
-                if all(self._state[p] == colour for p in boarder):
-                    score += len(group)
+            if not boarder & ~self._bb[colour]:
+                score += popcount(group)
 
         self._score[colour] += score
 
     def get_group(self, point):
         """Поиск камней, которые образуют группу"""
-        point_state = self._state[point]
-        group = {point}
-        boarder = set()
-        next_points = [point]
-
-        while next_points:
-            current_point = next_points.pop()
-            group.add(current_point)
-
-            for p in self.goban.neighbour_points(current_point):
-                if self._state[p] == point_state and p not in group:
-                    next_points.append(p)
-
-                if self._state[p] != point_state:
-                    boarder.add(p)
-
-        return group, boarder
+        group, boarder = self._get_group_mask(
+            1 << self.goban.point_to_bit(point))
+
+        return (set(self.goban.mask_to_points(group)),
+                set(self.goban.mask_to_points(boarder)))
+
+    def _get_group_mask(self, mask):
+        """Битовые маски группы, содержащей точку, и её границы"""
+        own = self._bb[self._points[mask.bit_length() - 1]]
+        (width, not_left_mask, not_right_mask) = self.goban.shift_masks()
+        own_left = own & not_left_mask
+        own_right = own & not_right_mask
+        group = 0
+        frontier = mask
+
+        while frontier:
+            group |= frontier
+            frontier = (((frontier << 1) & own_left)
+                        | ((frontier >> 1) & own_right)
+                        | (((frontier << width) | (frontier >> width)) & own)
+                        ) & ~group
+
+        return group, self.goban.expand(group) & ~own
 
     def catch_group(self, point):
         """Захват группы камней противника"""
-        group, boarder = self.get_group(point)
-        score = len(group)
+        group, boarder = self._get_group_mask(
+            1 << self.goban.point_to_bit(point))
+
+        return self._remove_group(group)
 
-        for point in group:
-            self._state[point] = self.FREE
+    def _remove_group(self, group):
+        """Удаление с поля камней, заданных битовой маской"""
+        for colour in self.TURNS:
+            self._bb[colour] &= ~group
+        self._bb[self.FREE] |= group
+        self._liberties = {}
+
+        score = popcount(group)
+        while group:
+            lsb = group & -group
+            group ^= lsb
+            self._points[lsb.bit_length() - 1] = self.FREE
 
         return score
 
@@ -220,74 +347,113 @@ class GameState:
 
     def get_liberties(self, point):
         """Поиск всех точек свободы"""
-        point_state = self._state[point]
-        next_points = [point]
-        visited = []
-        liberties = set()
+        mask = 1 << self.goban.point_to_bit(point)
 
-        if point_state == self.FREE:
+        if self._bb[self.FREE] & mask:
             return {point}
 
-        else:
-            while next_points:
-                current_point = next_points.pop()
-                visited.append(current_point)
+        group, boarder = self._get_group_mask(mask)
+        return set(self.goban.mask_to_points(boarder & self._bb[self.FREE]))
 
-                for p in self.goban.neighbour_points(current_point):
-                    if self._state[p] == point_state and p not in visited:
-                        next_points.append(p)
-                    if self._state[p] == self.FREE:
-                        liberties.add(p)
-
-        return liberties
+    def has_enemy_neighbours(self, point, colour):
+        """Есть ли рядом с точкой камни других цветов"""
+        return bool(
+            self.goban.expand(1 << self.goban.point_to_bit(point))
+            & ~(self._bb[colour] | self._bb[self.FREE]))
 
     def count_liberties(self, point):
         """Подсчёт количества точек свободы"""
-        return len(self.get_liberties(point))
+        bit = self.goban.point_to_bit(point)
+        liberties = self._liberties.get(bit)
+
+        if liberties is None:
+            mask = 1 << bit
+            if self._bb[self.FREE] & mask:
+                return 1
+
+            group, boarder = self._get_group_mask(mask)
+            liberties = popcount(boarder & self._bb[self.FREE])
+
+            while group:
+                lsb = group & -group
+                group ^= lsb
+                self._liberties[lsb.bit_length() - 1] = liberties
+
+        return liberties
 
     def get_free_points(self):
         """Возвращает множество свободных точек поля"""
-        return {point for point in self._state.keys()
-                if self._state[point] == self.FREE}
+        (mask, points) = self._free_points
+        if mask != self._bb[self.FREE]:
+            mask = self._bb[self.FREE]
+            points = frozenset(self.goban.mask_to_points(mask))
+            self._free_points = (mask, points)
+
+        return set(points)
+
+    def get_stones_mask(self, colour):
+        """Битовая маска камней заданного цвета"""
+        return self._bb[colour]
+
+    def get_legal_points(self, colour):
+        """Возвращает множество свободных точек, ход в которые
+        не приводит к самоубийству"""
+        free = self._bb[self.FREE]
+        legal = free & self.goban.expand(free)
+        own = self._bb[colour]
+
+        while own:
+            group, boarder = self._get_group_mask(own & -own)
+            own &= ~group
+
+            if popcount(boarder & free) > 1:
+                legal |= boarder & free
+
+        return set(self.goban.mask_to_points(legal))
 
     def get_winner(self):
-        return [key for key in self._score.keys()
-                if self._score[key] == max(self._score.values())]
+        best_score = max(self._score.values())
+        return [colour for (colour, score) in self._score.items()
+                if score == best_score]
 
     def convert_state_to_string(self):
-        point_states = {
-            GameState.BLACK: 'X',
-            GameState.GREY: '#',
-            GameState.WHITE: 'O',
-            GameState.FREE: '.'
-        }
-
-        result = ''
-        for y in range(self.goban.size()[1]):
-            for x in range(self.goban.size()[0]):
-                result += point_states[self._state[(x, y)]]
-            result += ';'
+        width = self.goban.size()[0]
+        cells = self._points.tobytes().translate(_CODE_TO_CHAR).decode('ascii')
 
-        return result
+        return ''.join(cells[start:start + width] + ';'
+                       for start in range(0, len(cells), width))
 
     @staticmethod
     def convert_string_to_state(string, separator):
-        point_states = {
-            'X': GameState.BLACK,
-            '#': GameState.GREY,
-            'O': GameState.WHITE,
-            '.': GameState.FREE
-        }
+        (size, masks, codes) = _parse_state_string(string, separator)
+        state = GameState(Goban(size))
+        state._bb = list(masks)
+        state._points = array.array('b', codes)
 
-        rows = list(filter(None, string.split(separator)))
-        goban = Goban((len(rows[0]), len(rows)))
-        state = GameState(goban)
+        return state
 
-        for x in range(len(rows[0])):
-            for y in range(len(rows)):
-                state.set_state((x, y), point_states[rows[y][x]])
 
-        return state
+@functools.lru_cache(maxsize=64)
+def _parse_state_string(string, separator):
+    """Размеры поля, битовые маски цветов и коды точек из строки"""
+    rows = list(filter(None, string.split(separator)))
+    width = len(rows[0])
+    cells = ''.join(rows).encode('ascii')
+    if (any(len(row) != width for row in rows)
+            or cells.translate(None, _POINT_CHARS)):
+        raise ValueError('Wrong state string')
+
+    masks = tuple(int(cells.translate(_CHAR_TO_DIGIT[colour])[::-1], 2)
+                  for colour in range(len(_POINT_CHARS)))
+    return (width, len(rows)), masks, cells.translate(_CHAR_TO_CODE)
+
+
+def _popcount(mask):
+    """Количество единичных битов в маске"""
+    return bin(mask).count('1')
+
+
+popcount = getattr(int, 'bit_count', _popcount)
 
 
 def cast_to_int(iterable):
@@ -1,19 +1,20 @@
 #!/usr/bin/env python3
 
 import random
-import multiprocessing.pool
+import multiprocessing
 import functools
+import time
 
 
 def timeout():
     def timeout_decorator(func):
         @functools.wraps(func)
-        def func_wrapper(*args, **kwargs):
-            pool = multiprocessing.pool.ThreadPool(processes=1)
-            async_result = pool.apply_async(func, args, kwargs)
-            max_timeout = args[2]
-            result = async_result.get(max_timeout)
-            return result
+        def func_wrapper(self, state, limit):
+            if limit is None:
+                self._deadline = None
+            else:
+                self._deadline = time.monotonic() + limit
+            return func(self, state, limit)
         return func_wrapper
     return timeout_decorator
 
@@ -31,6 +32,7 @@ class RealPlayer:
 class VirtualPlayer:
     def __init__(self, colour):
         self._colour = colour
+        self._deadline = None
 
     def get_colour(self):
         return self._colour
@@ -41,6 +43,11 @@ class VirtualPlayer:
     def find_point_to_move(self, state, limit):
         return False, None, 0
 
+    def check_time(self):
+        """Проверка, не истекло ли время на поиск хода"""
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise multiprocessing.TimeoutError
+
 
 class SimpleVirtualPlayer(VirtualPlayer):
     """Игрок, делающий ходы, не противоречащие правилам"""
@@ -63,14 +70,12 @@ class SimpleVirtualPlayer(VirtualPlayer):
 
     @timeout()
     def find_point_to_move(self, state, limit):
-        free_points = list(state.get_free_points())
-        random.shuffle(free_points)
+        legal_points = list(state.get_legal_points(state.get_turn()))
+        self.check_time()
 
-        for point in free_points:
-            try:
-                return True, point, state.make_move(point)
-            except ValueError:
-                continue
+        if legal_points:
+            point = random.choice(legal_points)
+            return True, point, state.make_move(point)
 
         return False, None, 0
 
@@ -104,9 +109,10 @@ class CleverVirtualPlayer(VirtualPlayer):
         free_points = list(state.get_free_points())
         random.shuffle(free_points)
         moves = []
-        forbidden_points = []
+        forbidden_points = set()
 
         for point in free_points:
+            self.check_time()
             self._current_point = point
 
             if (point not in forbidden_points
@@ -118,37 +124,36 @@ class CleverVirtualPlayer(VirtualPlayer):
                     return True, point, state.make_move(point)
 
                 except ValueError:
-                    forbidden_points.append(point)
+                    forbidden_points.add(point)
                     continue
 
         for point in free_points:
+            self.check_time()
             if point not in forbidden_points:
-                state.set_state(point, self._colour)
-
-                if (state.count_liberties(point) == 1
-                        and all(state.count_liberties(p) != 0
-                                for p in
-                                state.goban.neighbour_points(point))):
-                    state.set_state(point, state.FREE)
-                    forbidden_points.append(point)
-                    continue
+                neighbours = state.goban.neighbour_points(point)
 
-                state.set_state(point, state.FREE)
+                with state.speculative():
+                    state.set_state(point, self._colour)
+                    is_forbidden = (state.count_liberties(point) == 1
+                                    and all(state.count_liberties(p) != 0
+                                            for p in neighbours))
+
+                if is_forbidden:
+                    forbidden_points.add(point)
+                    continue
 
                 if any(state.get_state(p) == self._colour
                        and state.count_liberties(p) == 1
-                       for p in state.goban.neighbour_points(point)):
+                       for p in neighbours):
                     try:
                         self._current_point = point
                         return True, point, state.make_move(point)
 
                     except ValueError:
-                        forbidden_points.append(point)
+                        forbidden_points.add(point)
                         continue
 
-                if any(state.get_state(p) != state.FREE
-                       and state.get_state(p) != self._colour
-                       for p in state.goban.neighbour_points(point)):
+                if state.has_enemy_neighbours(point, self._colour):
                     move = self.check_moves_to_take_stones(state, point)
 
                     if move:
@@ -157,73 +162,68 @@ class CleverVirtualPlayer(VirtualPlayer):
         moves.sort(key=lambda x: x[0], reverse=True)
 
         while moves:
+            self.check_time()
             min_move = moves.pop()
             try:
                 self._current_point = min_move[1]
                 return True, min_move[1], state.make_move(min_move[1])
 
             except ValueError:
-                forbidden_points.append(min_move[1])
+                forbidden_points.add(min_move[1])
                 state.set_state(min_move[1], state.FREE)
                 continue
 
         for point in free_points:
+            self.check_time()
             if (point not in forbidden_points
-                    and any(state.get_state(p) != state.FREE
-                            and state.get_state(p) != self._colour
-                            for p in state.goban.neighbour_points(point))
+                    and state.has_enemy_neighbours(point, self._colour)
                     and self.check_liberties(state, point, point) > 1):
                 try:
                     self._current_point = point
                     return True, point, state.make_move(point)
 
                 except ValueError:
-                    forbidden_points.append(point)
+                    forbidden_points.add(point)
                     continue
 
         for point in free_points:
-            if point not in point not in forbidden_points:
+            self.check_time()
+            if point not in forbidden_points:
                 try:
                     self._current_point = point
                     return True, point, state.make_move(point)
 
                 except ValueError:
-                    forbidden_points.append(point)
+                    forbidden_points.add(point)
                     continue
 
         return False, None, 0
 
     def check_moves_to_take_stones(self, state, point):
         next_points = [point]
-        visited = []
-
-        while next_points:
-            current_point = next_points.pop()
-            state.set_state(current_point, self._colour)
-            visited.append(current_point)
-
-            if any(state.count_liberties(p) == 0
-                   for p in state.goban.neighbour_points(current_point)):
-                self.free_visited(visited, state)
-                return len(visited)
-
-            for np in state.goban.get_next_points(current_point):
-                if (state.get_state(np) == state.FREE
-                        and (any(state.get_state(p) != state.FREE
-                                 and state.get_state(p) != self._colour
-                                 for p in state.goban.neighbour_points(np)))):
-                    next_points.append(np)
-
-        self.free_visited(visited, state)
+        visited = set()
+
+        with state.speculative():
+            while next_points:
+                current_point = next_points.pop()
+                if current_point in visited:
+                    continue
+
+                state.set_state(current_point, self._colour)
+                visited.add(current_point)
+
+                if any(state.count_liberties(p) == 0
+                       for p in state.goban.neighbour_points(current_point)):
+                    return len(visited)
+
+                for np in state.goban.get_next_points(current_point):
+                    if (state.get_state(np) == state.FREE
+                            and state.has_enemy_neighbours(np, self._colour)):
+                        next_points.append(np)
+
         return 0
 
     def check_liberties(self, state, point, enemy_point):
-        state.set_state(point, self._colour)
-        liberties = state.count_liberties(enemy_point)
-        state.set_state(point, state.FREE)
-        return liberties
-
-    @staticmethod
-    def free_visited(visited, state):
-        for v in visited:
-            state.set_state(v, state.FREE)
+        with state.speculative():
+            state.set_state(point, self._colour)
+            return state.count_liberties(enemy_point)
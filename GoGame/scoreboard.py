@@ -11,21 +11,66 @@ LOGGER = logging.getLogger(LOGGER_NAME)
 
 class Scoreboard:
     SCOREBOARD_FILE = 'scores.dat'
+    VERSION = 1
 
     def __init__(self, filename=SCOREBOARD_FILE):
         LOGGER.info('Loading scoreboard file "%s"', filename)
         self._filename = filename
+        self._scores = {}
+        self._sorted_scores = {}
+        self._line_ended = True
 
         if not os.path.exists(filename):
             LOGGER.info('Scoreboard file is missing and will be created')
             with open(filename, 'x') as f:
-                json.dump({}, f)
+                f.write(json.dumps({'_v': self.VERSION}) + '\n')
 
         with open(filename) as f:
-            self._scores = self._check(json.load(f))
+            trusted = False
+            for (index, line) in enumerate(f):
+                self._line_ended = line.endswith('\n')
+                if not line.strip():
+                    continue
+
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    LOGGER.warning('Wrong scoreboard line %s: "%s". Skip',
+                                   index + 1, line.rstrip('\n'))
+                    continue
+
+                if trusted:
+                    try:
+                        (key, name, score) = data
+                        self._scores.setdefault(key, []).append(
+                            (name, score))
+                    except (ValueError, TypeError):
+                        LOGGER.warning(
+                            'Wrong scoreboard record: "%s". Skip', data)
+                elif index == 0 and data == {'_v': self.VERSION}:
+                    LOGGER.info('Scoreboard file has version %s, '
+                                'records are not checked', self.VERSION)
+                    trusted = True
+                else:
+                    self._load_line(data)
 
         LOGGER.info('Scoreboard was loaded')
 
+    def _load_line(self, data):
+        if isinstance(data, dict):
+            for (key, items) in self._check(data).items():
+                self._scores.setdefault(key, []).extend(items)
+            return
+
+        if (not isinstance(data, list) or len(data) != 3
+                or not isinstance(data[0], str)):
+            LOGGER.warning('Wrong scoreboard record: "%s". Skip', data)
+            return
+
+        item = self._check_item(data[0], data[1:])
+        if item is not None:
+            self._scores.setdefault(data[0], []).append(item)
+
     def _check(self, scores):
         LOGGER.info('Checking scoreboard data...')
         result = {}
@@ -45,35 +90,41 @@ class Scoreboard:
                 continue
 
             for value in values:
-                if not isinstance(value, list):
-                    LOGGER.warning(
-                        'Invalid type of scoreboard item in "%s": "%s". Skip',
-                        key, type(value))
-                    continue
-                if len(value) != 2:
-                    LOGGER.warning('Wrong scoreboard item: "%s". Skip', value)
-                    continue
-                if not isinstance(value[0], str):
-                    LOGGER.warning(
-                        'Invalid type of `name` in scoreboard item: '
-                        '"%s". Skip', type(value[0]))
-                    continue
-                if not isinstance(value[1], int):
-                    LOGGER.warning(
-                        'Invalid type of `score` in scoreboard item: '
-                        '"%s". Skip', type(value[1]))
-                    continue
-                if value[1] <= 0:
-                    LOGGER.warning(
-                        'Invalid value of `score` in scoreboard item: '
-                        '"%s". Skip', value[1])
-                    continue
-                items.append(tuple(value))
+                item = self._check_item(key, value)
+                if item is not None:
+                    items.append(item)
 
             result[key] = items
 
         return result
 
+    @staticmethod
+    def _check_item(key, value):
+        if not isinstance(value, list):
+            LOGGER.warning(
+                'Invalid type of scoreboard item in "%s": "%s". Skip',
+                key, type(value))
+            return None
+        if len(value) != 2:
+            LOGGER.warning('Wrong scoreboard item: "%s". Skip', value)
+            return None
+        if not isinstance(value[0], str):
+            LOGGER.warning(
+                'Invalid type of `name` in scoreboard item: '
+                '"%s". Skip', type(value[0]))
+            return None
+        if not isinstance(value[1], int):
+            LOGGER.warning(
+                'Invalid type of `score` in scoreboard item: '
+                '"%s". Skip', type(value[1]))
+            return None
+        if value[1] <= 0:
+            LOGGER.warning(
+                'Invalid value of `score` in scoreboard item: '
+                '"%s". Skip', value[1])
+            return None
+        return tuple(value)
+
     def add_score(self, size, name, score):
         name = str(name)
         score = int(score)
@@ -81,15 +132,28 @@ class Scoreboard:
 
         LOGGER.info('Adding new record in "%s": <"%s", "%s">',
                     key, name, score)
+        if score <= 0:
+            LOGGER.warning(
+                'Invalid value of `score` in scoreboard item: '
+                '"%s". Skip', score)
+            return
+
         if key not in self._scores:
             self._scores[key] = []
         self._scores[key].append((name, score))
+        self._sorted_scores.pop(key, None)
 
-        with open(self._filename, 'w') as f:
-            json.dump(self._scores, f)
+        with open(self._filename, 'a') as f:
+            if not self._line_ended:
+                f.write('\n')
+            f.write(json.dumps([key, name, score]) + '\n')
+        self._line_ended = True
         LOGGER.info('Record written')
 
     def get_scores(self, size):
         key = str(size)
-        return sorted(self._scores.get(key, []),
-                      key=operator.itemgetter(1), reverse=True)
+        if key not in self._sorted_scores:
+            self._sorted_scores[key] = sorted(
+                self._scores.get(key, []),
+                key=operator.itemgetter(1), reverse=True)
+        return list(self._sorted_scores[key])
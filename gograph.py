@@ -15,9 +15,15 @@ import argparse
 from contextlib import contextmanager
 import time
 import logging
+import logging.handlers
 import json
 import zlib
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from GoGame import game, players, scoreboard
 except Exception as e:
@@ -26,7 +32,6 @@ except Exception as e:
 
 try:
     from PyQt5 import QtWidgets, QtCore, QtGui
-    from PyQt5.QtWebEngineWidgets import QWebEngineView
 except Exception as e:
     print('PyQt5 not found: "{}".'.format(e), file=sys.stderr)
     sys.exit(ERROR_QT_VERSION)
@@ -38,6 +43,10 @@ __email__ = 'mdyuzheva@gmail.com'
 
 LOGGER_NAME = 'go'
 LOGGER = logging.getLogger(LOGGER_NAME)
+LOG_FORMATTER = logging.Formatter(
+    '%(asctime)s [%(levelname)s <%(name)s>] %(message)s')
+
+_FOCUS_OTHER = QtCore.Qt.OtherFocusReason
 
 
 @contextmanager
@@ -51,6 +60,8 @@ def temp_painter(device):
 
 
 class GuiGoban(QtWidgets.QFrame):
+    _COORD_FONT = QtGui.QFont('Monospace', 7, QtGui.QFont.Bold)
+
     def __init__(self, window, size, log, start_time,
                  additional_time, parent=None):
         LOGGER.info('Creating new field with size %s:%s', size[0], size[1])
@@ -66,6 +77,14 @@ class GuiGoban(QtWidgets.QFrame):
         self.resize(self.w, self.h)
         self.goban = game.Goban(size)
         self.state = game.GameState(self.goban)
+        self._board_layer = None
+        self._stones = {colour: 0 for colour in self.state.TURNS}
+        graph_coords = [
+            convert_game_to_graph_coords(self.goban.bit_to_point(bit))
+            for bit in range(size[0] * size[1])]
+        self._stone_ellipses = [QtCore.QRect(x - 15, y - 15, 30, 30)
+                                for (x, y) in graph_coords]
+        self._stone_rects = [stone_rect(point) for point in graph_coords]
 
         self.pass_moves = {
             game.GameState.BLACK: 0,
@@ -91,33 +110,72 @@ class GuiGoban(QtWidgets.QFrame):
         self.repaint_goban()
         self.show()
 
-    def repaint_goban(self):
-        self.image = QtGui.QImage(
-            self.w, self.h, QtGui.QImage.Format_ARGB32)
-        self.image.fill(QtGui.QColor(253, 217, 181))
-
-        with temp_painter(self.image) as painter:
-            for i in range(30, self.w, 30):
-                for j in range(30, self.h, 30):
-                    pen = QtGui.QPen(QtCore.Qt.black)
-                    painter.setPen(pen)
-                    painter.drawLine(i, 30, i, self.h - 30)
-                    painter.drawLine(30, j, self.w - 30, j)
+    def draw_board_layer(self):
+        board = QtGui.QImage(self.w, self.h, QtGui.QImage.Format_RGB32)
+        board.fill(QtGui.QColor(253, 217, 181))
+
+        with temp_painter(board) as painter:
+            painter.setPen(QtGui.QPen(QtCore.Qt.black))
+            lines = [QtCore.QLine(i, 30, i, self.h - 30)
+                     for i in range(30, self.w, 30)]
+            lines.extend(QtCore.QLine(30, j, self.w - 30, j)
+                         for j in range(30, self.h, 30))
+            painter.drawLines(lines)
 
             self.draw_coords(painter)
 
-            for i in range(30, self.w, 30):
-                for j in range(30, self.h, 30):
-                    point = convert_graph_to_game_coords((i, j))
+        return board
 
-                    if self.state.get_state(point) != self.state.FREE:
-                        stone = Stone((i, j), self.state.get_state(point))
-                        stone.draw_stone(painter)
+    def repaint_goban(self):
+        if self._board_layer is None:
+            self._board_layer = self.draw_board_layer()
+        self.pixmap = QtGui.QPixmap.fromImage(self._board_layer)
+
+        with temp_painter(self.pixmap) as painter:
+            painter.setPen(QtCore.Qt.black)
+            for colour in self.state.TURNS:
+                self._stones[colour] = self.state.get_stones_mask(colour)
+                painter.setBrush(Stone.COLOURS[colour])
+                for bit in self.goban.mask_to_bits(self._stones[colour]):
+                    painter.drawEllipse(self._stone_ellipses[bit])
         self.repaint()
 
+    def update_goban(self):
+        if self._board_layer is None:
+            self.repaint_goban()
+            return
+
+        stones = {colour: self.state.get_stones_mask(colour)
+                  for colour in self.state.TURNS}
+        if stones == self._stones:
+            return
+
+        removed = 0
+        for colour in self.state.TURNS:
+            removed |= self._stones[colour] & ~stones[colour]
+
+        touched = self.goban.expand_next(removed)
+        removed_rects = [self._stone_rects[bit]
+                         for bit in self.goban.mask_to_bits(removed)]
+
+        with temp_painter(self.pixmap) as painter:
+            for rect in removed_rects:
+                painter.drawImage(rect, self._board_layer, rect)
+
+            painter.setPen(QtCore.Qt.black)
+            for colour in self.state.TURNS:
+                painter.setBrush(Stone.COLOURS[colour])
+                changed = stones[colour] & (~self._stones[colour] | touched)
+                for bit in self.goban.mask_to_bits(changed):
+                    painter.drawEllipse(self._stone_ellipses[bit])
+                    self.update(self._stone_rects[bit])
+                self._stones[colour] = stones[colour]
+
+        for rect in removed_rects:
+            self.update(rect)
+
     def draw_coords(self, painter):
-        font = QtGui.QFont('Monospace', 7, QtGui.QFont.Bold)
-        painter.setFont(font)
+        painter.setFont(self._COORD_FONT)
 
         for width_index, x in enumerate(range(30, self.w, 30)):
             painter.drawText(x - 5, self.h, str(width_index))
@@ -151,40 +209,36 @@ class GuiGoban(QtWidgets.QFrame):
 
     def paintEvent(self, event):
         with temp_painter(self) as painter:
-            painter.drawImage(0, 0, self.image)
+            painter.drawPixmap(event.rect(), self.pixmap, event.rect())
 
 
 class HiScoresWindow(QtWidgets.QDialog):
-    _TEMPLATE = """<html>
+    _HEAD = """<html>
     <head>
         <style>
-            table {{
+            table {
                 border: 3px double black;
                 width: 100%;
-            }}
+            }
 
-            td.place {{ text-align: center; font-size: 17pt; }}
-            td.name {{ font-size: 17pt; }}
-            td.score {{ font-weight: bold; font-size: 17pt; }}
+            td.place { text-align: center; font-size: 17pt; }
+            td.name { font-size: 17pt; }
+            td.score { font-weight: bold; font-size: 17pt; }
         </style>
     </head>
     <body>
-        <h1 align='center'>{}</h1>
-        <table>{}</table>
+        <h1 align='center'>Records</h1>
+        <table width='100%' border='3' cellspacing='0'>"""
+
+    _TAIL = """</table>
     </body>
 </html>"""
 
-    _ROW_TEMPLATE = """<tr>
-<td class='place'>{}</td>
-<td class='name'>{}</td>
-<td class='score'>{}</td>
-</tr>"""
-
     def __init__(self, scoreboard, size, parent=None):
         super().__init__(parent)
         self._size = size
         self._scores = scoreboard
-        self._viewer = QWebEngineView()
+        self._viewer = QtWidgets.QTextBrowser()
 
         self._btns = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok)
         self._btns.accepted.connect(self.close)
@@ -196,19 +250,16 @@ class HiScoresWindow(QtWidgets.QDialog):
         self.setLayout(layout)
         self.setWindowTitle('Go')
 
-    @staticmethod
-    def _make_row(place, name, score):
-        return HiScoresWindow._ROW_TEMPLATE.format(place, name, score)
-
     def prepare(self):
         scores = self._scores.get_scores(self._size)
 
         table = ''.join(
-            HiScoresWindow._make_row(place + 1, name, score)
-            for (place, (name, score)) in enumerate(scores))
+            f"<tr><td class='place'>{place}</td>"
+            f"<td class='name'>{name}</td>"
+            f"<td class='score'>{score}</td></tr>"
+            for (place, (name, score)) in enumerate(scores, 1))
 
-        self._viewer.setHtml(HiScoresWindow._TEMPLATE.format(
-            'Records', table))
+        self._viewer.setHtml(self._HEAD + table + self._TAIL)
 
 
 class GoGame(QtWidgets.QMainWindow):
@@ -225,10 +276,20 @@ class GoGame(QtWidgets.QMainWindow):
         None: "Doesn't play"
     }
 
+    _LABEL_FONT = QtGui.QFont('Monospace', 10, QtGui.QFont.Bold)
+    _POLL_INTERVAL = 20
+    _VIRTUAL_MOVE_TIME = 1000
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._move_handlers = {
+            players.RealPlayer: self._real_player_move,
+            players.SimpleVirtualPlayer: self._virtual_player_move,
+            players.CleverVirtualPlayer: self._virtual_player_move,
+        }
         self.init_ui()
         self._game_started = False
+        self._paused_turn = None
         self.show()
         self._set_params()
 
@@ -280,7 +341,7 @@ class GoGame(QtWidgets.QMainWindow):
         self._scores_widget.setMinimumHeight(100)
 
         self._turn = QtWidgets.QLabel(self)
-        self._turn.setFont(QtGui.QFont('Monospace', 10, QtGui.QFont.Bold))
+        self._turn.setFont(self._LABEL_FONT)
         self._turn.setIndent(15)
 
         self._scroller = QtWidgets.QScrollArea(self)
@@ -329,6 +390,7 @@ class GoGame(QtWidgets.QMainWindow):
 
     def _set_goban(self, size, states, game_time):
         self._size = size
+        self._paused_turn = None
         self._start_time.clear()
         self._log.clear()
 
@@ -371,17 +433,15 @@ class GoGame(QtWidgets.QMainWindow):
         for turn in self.active_players:
             player_layout = QtWidgets.QHBoxLayout()
             player = QtWidgets.QLabel(self)
-            player.setFont(QtGui.QFont('Monospace', 10, QtGui.QFont.Bold))
+            player.setFont(self._LABEL_FONT)
             player.setText(f'{self.NAMES[turn]}:')
 
             self._score[turn] = QtWidgets.QLabel(self)
-            self._score[turn].setFont(
-                QtGui.QFont('Monospace', 10, QtGui.QFont.Bold))
+            self._score[turn].setFont(self._LABEL_FONT)
 
             self._time_labels[turn] = QtWidgets.QLabel(
                 time_to_str(0), self)
-            self._time_labels[turn].setFont(
-                QtGui.QFont('Monospace', 10, QtGui.QFont.Bold))
+            self._time_labels[turn].setFont(self._LABEL_FONT)
 
             player_layout.addWidget(player)
             player_layout.addWidget(self._score[turn])
@@ -393,42 +453,56 @@ class GoGame(QtWidgets.QMainWindow):
 
     def _set_time(self, game_time):
         self.timer = QtCore.QTimer(self)
+        self._shown_time = {}
 
         for turn, time in zip(self.players.keys(), game_time):
             self._start_time[turn] = time
 
         for turn, time in zip(self.active_players, game_time):
             self._time_labels[turn].setText(time_to_str(time))
-            LOGGER.info(
-                f'Time for {self.NAMES[turn]} changed to {time / 60000} min')
+            LOGGER.info('Time for %s changed to %s min',
+                        self.NAMES[turn], time / 60000)
 
         self.timer.setInterval(50)
         self.timer.timeout.connect(self.timerEvent)
 
     def timerEvent(self):
-        turn = self._goban.state.get_turn()
+        if self._paused_turn is not None:
+            turn = self._paused_turn
+        else:
+            turn = self._goban.state.get_turn()
+        start_time = self._start_time
 
-        if self._start_time[turn] != 0:
-            self._start_time[turn] -= 50
+        if start_time[turn] != 0:
+            start_time[turn] -= 50
 
-        for turn in self.active_players:
-            self._time_labels[turn].setText(
-                time_to_str(self._start_time[turn]))
+        for colour, label in self._time_labels.items():
+            if self._shown_time.get(colour) != start_time[colour]:
+                self._shown_time[colour] = start_time[colour]
+                label.setText(time_to_str(start_time[colour]))
 
     def _start_game(self):
         self._game_started = True
-        while all(passed <= 1 for passed in self._goban.pass_moves.values()):
-            self._player_move(self.players[self._goban.state.get_turn()])
-            self._update_score()
+        QtCore.QTimer.singleShot(0, self._step_game)
 
-            if (self._start_time
-                    and all(v == 0 for v in self._start_time.values())):
-                break
+    def _step_game(self):
+        self._paused_turn = None
+        if (any(passed > 1 for passed in self._goban.pass_moves.values())
+                or (self._start_time
+                    and all(v == 0 for v in self._start_time.values()))):
+            if self._start_time:
+                self.timer.stop()
 
-        if self._start_time:
-            self.timer.stop()
+            self._end_game()
+            return
 
-        self._end_game()
+        self._player_move(self.players[self._goban.state.get_turn()])
+
+    def _end_move(self, delay=0):
+        self._update_turn()
+        self._goban.update_goban()
+        self._update_score()
+        QtCore.QTimer.singleShot(delay, self._step_game)
 
     def _end_game(self):
         for player in self.players.keys():
@@ -449,7 +523,7 @@ class GoGame(QtWidgets.QMainWindow):
             winner_colour = self.NAMES[winners[0]]
             LOGGER.info('Game over, %s win!', winner_colour)
 
-            if (isinstance(self.players[winners[0]], players.RealPlayer)
+            if (type(self.players[winners[0]]) is players.RealPlayer
                     and self._scoreboard is not None):
                 name, ok = QtWidgets.QInputDialog.getText(
                     self, 'Game over!', '{} win!\nEnter your name:'.format(
@@ -531,7 +605,7 @@ class GoGame(QtWidgets.QMainWindow):
                 LOGGER.info('Loaded game from "%s"', filename)
 
     def _load(self, f):
-        data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        data = load_json(zlib.decompress(f.read()))
 
         for key in data:
             if key not in ('size', 'state', 'players', 'scores', 'turn',
@@ -560,11 +634,9 @@ class GoGame(QtWidgets.QMainWindow):
         LOGGER.info('Parsing state')
         loaded_state = game.GameState.convert_string_to_state(
             data['state'], ';')
-
-        for x in range(data['size'][0]):
-            for y in range(data['size'][1]):
-                self._goban.state.set_state((x, y),
-                                            loaded_state.get_state((x, y)))
+        if loaded_state.goban.size() != self._goban.goban.size():
+            raise ValueError('State does not match goban size')
+        self._goban.state.restore(loaded_state.snapshot())
 
         LOGGER.info('Setting scores')
         for name, score in zip(self.NAMES.keys(), data['scores']):
@@ -602,8 +674,7 @@ class GoGame(QtWidgets.QMainWindow):
                         'addition': self._additional_time,
                         'log': self._log.get_data_from_log_table()
                     }
-                    f.write(
-                        zlib.compress(json.dumps(data).encode('utf-8')))
+                    f.write(zlib.compress(dump_json(data), 1))
 
             except Exception as e:
                 LOGGER.error(
@@ -617,8 +688,9 @@ class GoGame(QtWidgets.QMainWindow):
                 LOGGER.info('Saved game to "%s"', filename)
 
     def _update_score(self):
+        scores = self._goban.state.get_score()
         for name, score in self._score.items():
-            score.setText(str(self._goban.state.get_score()[name]))
+            score.setText(str(scores[name]))
 
     def _update_turn(self):
         self._turn.setText('Current move: {}'.format(
@@ -632,9 +704,8 @@ class GoGame(QtWidgets.QMainWindow):
             sys.exit()
 
     def _set_player_state(self, state, colour):
-        LOGGER.info(
-            f"State of {self.NAMES[colour]} player changed to "
-            f"'{self.PLAYER_STATES[state]}'")
+        LOGGER.info("State of %s player changed to '%s'",
+                    self.NAMES[colour], self.PLAYER_STATES[state])
 
         if state is None:
             return None
@@ -642,25 +713,21 @@ class GoGame(QtWidgets.QMainWindow):
         return state(colour)
 
     def _player_move(self, player):
-        if isinstance(player, players.RealPlayer):
-            turn = self._goban.state.get_turn()
+        self._goban.setEnabled(type(player) is players.RealPlayer)
+        self._move_handlers.get(type(player), self._skip_move)(player)
 
-            if self._start_time and self._start_time[turn] == 0:
-                self.player_pass()
-                return
-            QtCore.QCoreApplication.processEvents()
-
-        elif (isinstance(player, players.SimpleVirtualPlayer)
-              or isinstance(player, players.CleverVirtualPlayer)):
-            QtCore.QCoreApplication.processEvents(
-                QtCore.QEventLoop.ExcludeUserInputEvents)
-            self._virtual_player_move(player)
+    def _real_player_move(self, player):
+        turn = self._goban.state.get_turn()
 
+        if self._start_time and self._start_time[turn] == 0:
+            self.player_pass()
+            self._end_move()
         else:
-            self._goban.state.next_turn()
+            self._end_move(self._POLL_INTERVAL)
 
-        self._update_turn()
-        self._goban.repaint_goban()
+    def _skip_move(self, player):
+        self._goban.state.next_turn()
+        self._end_move()
 
     def _virtual_player_move(self, player):
         turn = self._goban.state.get_turn()
@@ -669,6 +736,7 @@ class GoGame(QtWidgets.QMainWindow):
             limit = self._start_time[turn] / 1000
             if limit == 0:
                 self.player_pass()
+                self._end_move()
                 return
         else:
             limit = None
@@ -680,21 +748,20 @@ class GoGame(QtWidgets.QMainWindow):
 
         if can_move:
             self._goban.pass_moves[turn] = 0
-            while time.time() - ts < 1:
-                QtCore.QCoreApplication.processEvents(
-                    QtCore.QEventLoop.ExcludeUserInputEvents)
-
             self._log.add_move_info(turn, point, taken_stones)
 
             if self._start_time:
                 self._start_time[turn] += self._additional_time
 
-            if self._goban.state.get_turn() == turn:
-                self._goban.state.next_turn()
-
+            self._goban.state.next_turn()
             self._goban.is_saved = False
+
+            self._paused_turn = turn
+            elapsed = int((time.time() - ts) * 1000)
+            self._end_move(max(0, self._VIRTUAL_MOVE_TIME - elapsed))
         else:
             self.player_pass()
+            self._end_move()
 
     def player_pass(self):
         turn = self._goban.state.get_turn()
@@ -729,15 +796,16 @@ class LogTable(QtWidgets.QTableWidget):
             self.setColumnWidth(column, 210 / column_count)
 
     def add_move_info(self, turn, point, taken_stones):
+        name = GoGame.NAMES[turn]
         if point is None:
-            LOGGER.info(f'{GoGame.NAMES[turn]} pass')
+            LOGGER.info('%s pass', name)
             current_item = QtWidgets.QTableWidgetItem('pass')
         else:
-            LOGGER.info(f'{GoGame.NAMES[turn]} make move {point}')
+            LOGGER.info('%s make move %s', name, point)
             current_item = QtWidgets.QTableWidgetItem(f'{point}')
 
         if taken_stones != 0:
-            LOGGER.info(f'{GoGame.NAMES[turn]} take {taken_stones} stones')
+            LOGGER.info('%s take %s stones', name, taken_stones)
 
         self.set_item(current_item)
 
@@ -753,8 +821,17 @@ class LogTable(QtWidgets.QTableWidget):
         return data
 
     def fill_log_table(self, data):
-        for item in data:
-            self.set_item(QtWidgets.QTableWidgetItem(item))
+        column_count = self.columnCount()
+        start = (self.rowCount() - 1) * column_count + self._current_column
+        end = start + len(data)
+
+        self.setUpdatesEnabled(False)
+        self.setRowCount(end // column_count + 1)
+        for index, item in enumerate(data, start):
+            self.setItem(index // column_count, index % column_count,
+                         QtWidgets.QTableWidgetItem(item))
+        self._current_column = end % column_count
+        self.setUpdatesEnabled(True)
 
     def set_item(self, item):
         self.setItem(self.rowCount() - 1, self._current_column, item)
@@ -780,19 +857,7 @@ class Stone:
 
     @staticmethod
     def get_graph_point(coords):
-        delta_x = coords[0] % 30
-        if delta_x >= 15:
-            delta_x = delta_x - 30
-        delta_y = coords[1] % 30
-        if delta_y >= 15:
-            delta_y = delta_y - 30
-        return coords[0] - delta_x, coords[1] - delta_y
-
-    def draw_stone(self, painter):
-        painter.setPen(QtCore.Qt.black)
-        painter.setBrush(self.colour)
-        painter.drawEllipse(self.graph_point[0] - 15,
-                            self.graph_point[1] - 15, 30, 30)
+        return (coords[0] + 15) // 30 * 30, (coords[1] + 15) // 30 * 30
 
 
 class StartGameWindow(QtWidgets.QDialog):
@@ -803,11 +868,53 @@ class StartGameWindow(QtWidgets.QDialog):
         "Clever virtual player": players.CleverVirtualPlayer,
         "Doesn't play": None
     }
+    _PLAYER_STATE_VALUES = list(PLAYER_STATES.values())
+
+    _SIZES = [
+        (11, 11),
+        (15, 15),
+        (19, 19)
+    ]
+
+    _TIMES = [
+        ('Without time limit', 0),
+        ('1 minute', 1 * 60000.0),
+        ('3 minutes', 3 * 60000.0),
+        ('5 minutes', 5 * 60000.0),
+    ]
+
+    _ADDITIONS = [
+        ('0 seconds', 0 * 1000.0),
+        ('5 seconds', 5 * 1000.0),
+        ('10 seconds', 10 * 1000.0),
+        ('15 seconds', 15 * 1000.0),
+    ]
+
+    _PLAYER_TITLES = [
+        'First player (black)',
+        'Second player (grey)',
+        'Third player (white)'
+    ]
+
+    _TITLE_FONT = QtGui.QFont('Monospace', 8, QtGui.QFont.Bold)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle('Go')
 
+        self._size_group = None
+        self._time_combo = None
+        self._ad_time_combo = None
+        self._player_groups = [None] * len(self._PLAYER_TITLES)
+        self._error_box = None
+
+    def showEvent(self, event):
+        if self.layout() is None:
+            self._init_ui()
+        super().showEvent(event)
+
+    def _init_ui(self):
+        """Построение окна при первом показе"""
         self._set_size_layout()
         self._set_time_layout()
         self._set_additional_time_layout()
@@ -820,7 +927,7 @@ class StartGameWindow(QtWidgets.QDialog):
         layout = QtWidgets.QVBoxLayout()
 
         params_title = QtWidgets.QLabel()
-        params_title.setFont(QtGui.QFont('Monospace', 8, QtGui.QFont.Bold))
+        params_title.setFont(self._TITLE_FONT)
         params_title.setAlignment(QtCore.Qt.AlignHCenter)
         params_title.setText('Game parameters')
 
@@ -830,7 +937,7 @@ class StartGameWindow(QtWidgets.QDialog):
         self._set_players_layout()
 
         players_title = QtWidgets.QLabel()
-        players_title.setFont(QtGui.QFont('Monospace', 8, QtGui.QFont.Bold))
+        players_title.setFont(self._TITLE_FONT)
         players_title.setAlignment(QtCore.Qt.AlignHCenter)
         players_title.setText("Players' parameters")
 
@@ -848,156 +955,99 @@ class StartGameWindow(QtWidgets.QDialog):
         self.setLayout(layout)
 
     def _set_size_layout(self):
-        self._size_sel_layout = QtWidgets.QVBoxLayout()
-
-        sizes = [
-            '11:11',
-            '15:15',
-            '19:19'
-        ]
-
-        for s in sizes:
-            self._size_sel_layout.addWidget(QtWidgets.QRadioButton(s))
-
-        self._other = QtWidgets.QRadioButton('Other size')
-        self._other.toggled.connect(self._click_other)
-        self._size_sel_layout.addWidget(self._other)
-
-        self._size_sel_layout.itemAt(0).widget().setChecked(True)
-
-        self._selector = QtWidgets.QGroupBox()
-        self._selector.setTitle('Field size')
-        self._selector.setLayout(self._size_sel_layout)
-
-        self._inputs = QtWidgets.QHBoxLayout()
-        inp = QtWidgets.QLineEdit()
-        self._inputs.addWidget(inp)
-        self._inputs.itemAt(0).widget().setPlaceholderText('15:15')
-        self._hide_inputs()
-
-        self.size_layout = QtWidgets.QVBoxLayout()
-        self.size_layout.addWidget(self._selector)
-        self.size_layout.addLayout(self._inputs)
-
-    def _click_other(self, show):
-        self._hide_inputs(not show)
-        if show:
-            inp = self._inputs.itemAt(0).widget()
-            inp.setFocus(QtCore.Qt.OtherFocusReason)
-
-    def _hide_inputs(self, value=True):
-        for idx in range(self._inputs.count()):
-            self._inputs.itemAt(idx).widget().setVisible(not value)
-
-        self.resize(self.width(), self.minimumSizeHint().height())
+        (self.size_layout, self._size_group, self._size_input) = \
+            self._build_radio_selector(
+                'Field size', ['{}:{}'.format(*s) for s in self._SIZES],
+                'Other size', '15:15')
 
     def _set_time_layout(self):
-        self._time_sel_layout = QtWidgets.QVBoxLayout()
+        (self.time_layout, self._time_combo, self._time_input) = \
+            self._build_combo_selector(
+                'Game time', self._TIMES, 'Other time (in minutes)', '10')
 
-        times = [
-            'Without time limit',
-            '1 minute',
-            '3 minutes',
-            '5 minutes',
-        ]
-
-        for t in times:
-            self._time_sel_layout.addWidget(QtWidgets.QRadioButton(t))
-
-        self._time_other = QtWidgets.QRadioButton('Other time (in minutes)')
-        self._time_other.toggled.connect(self._click_time_other)
-        self._time_sel_layout.addWidget(self._time_other)
-
-        self._time_sel_layout.itemAt(0).widget().setChecked(True)
+    def _set_additional_time_layout(self):
+        (self.ad_time_layout, self._ad_time_combo, self._ad_time_input) = \
+            self._build_combo_selector(
+                'Game additional time', self._ADDITIONS,
+                'Other time (in seconds)', '20')
 
-        self._time_selector = QtWidgets.QGroupBox()
-        self._time_selector.setTitle('Game time')
-        self._time_selector.setLayout(self._time_sel_layout)
+    def _build_radio_selector(self, title, options, other_option,
+                              placeholder):
+        """Группа переключателей с полем ввода своего значения"""
+        sel_layout = QtWidgets.QVBoxLayout()
+        group = QtWidgets.QButtonGroup(self)
 
-        self._time_inputs = QtWidgets.QHBoxLayout()
-        time_inp = QtWidgets.QLineEdit()
-        self._time_inputs.addWidget(time_inp)
-        self._time_inputs.itemAt(0).widget().setPlaceholderText('10')
-        self._hide_time_inputs()
+        for index, option in enumerate(options + [other_option]):
+            radio = QtWidgets.QRadioButton(option)
+            group.addButton(radio, index)
+            sel_layout.addWidget(radio)
 
-        self.time_layout = QtWidgets.QVBoxLayout()
-        self.time_layout.addWidget(self._time_selector)
-        self.time_layout.addLayout(self._time_inputs)
+        group.button(0).setChecked(True)
 
-    def _click_time_other(self, show):
-        self._hide_time_inputs(not show)
-        if show:
-            inp = self._time_inputs.itemAt(0).widget()
-            inp.setFocus(QtCore.Qt.OtherFocusReason)
+        (layout, inp) = self._wrap_selector(title, sel_layout, placeholder)
+        group.button(len(options)).toggled.connect(
+            lambda show: self._click_other(inp, show))
 
-    def _hide_time_inputs(self, value=True):
-        for idx in range(self._time_inputs.count()):
-            self._time_inputs.itemAt(idx).widget().setVisible(not value)
+        return layout, group, inp
 
-        self.resize(self.width(), self.minimumSizeHint().height())
+    def _build_combo_selector(self, title, options, other_option,
+                              placeholder):
+        """Выпадающий список вариантов с полем ввода своего значения"""
+        combo = QtWidgets.QComboBox()
+        for (text, value) in options:
+            combo.addItem(text, value)
+        combo.addItem(other_option, None)
 
-    def _set_additional_time_layout(self):
-        self._ad_time_sel_layout = QtWidgets.QVBoxLayout()
+        sel_layout = QtWidgets.QVBoxLayout()
+        sel_layout.addWidget(combo)
+        sel_layout.addStretch()
 
-        additions = [
-            '0 seconds',
-            '5 seconds',
-            '10 seconds',
-            '15 seconds',
-        ]
+        (layout, inp) = self._wrap_selector(title, sel_layout, placeholder)
+        combo.currentIndexChanged.connect(
+            lambda index: self._click_other(inp, index == len(options)))
 
-        for ad in additions:
-            self._ad_time_sel_layout.addWidget(QtWidgets.QRadioButton(ad))
+        return layout, combo, inp
 
-        self._ad_time_other = QtWidgets.QRadioButton(
-            'Other time (in seconds)')
-        self._ad_time_other.toggled.connect(self._click_ad_time_other)
-        self._ad_time_sel_layout.addWidget(self._ad_time_other)
+    @staticmethod
+    def _wrap_selector(title, sel_layout, placeholder):
+        """Рамка с заголовком вокруг вариантов и скрытое поле ввода"""
+        selector = QtWidgets.QGroupBox()
+        selector.setTitle(title)
+        selector.setLayout(sel_layout)
 
-        self._ad_time_sel_layout.itemAt(0).widget().setChecked(True)
+        inp = QtWidgets.QLineEdit()
+        inp.setPlaceholderText(placeholder)
+        inp.setVisible(False)
 
-        self._ad_time_selector = QtWidgets.QGroupBox()
-        self._ad_time_selector.setTitle('Game additional time')
-        self._ad_time_selector.setLayout(self._ad_time_sel_layout)
+        inputs = QtWidgets.QHBoxLayout()
+        inputs.addWidget(inp)
 
-        self._ad_time_inputs = QtWidgets.QHBoxLayout()
-        ad_time_inp = QtWidgets.QLineEdit()
-        self._ad_time_inputs.addWidget(ad_time_inp)
-        self._ad_time_inputs.itemAt(0).widget().setPlaceholderText('20')
-        self._hide_ad_time_inputs()
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(selector)
+        layout.addLayout(inputs)
 
-        self.ad_time_layout = QtWidgets.QVBoxLayout()
-        self.ad_time_layout.addWidget(self._ad_time_selector)
-        self.ad_time_layout.addLayout(self._ad_time_inputs)
+        return layout, inp
 
-    def _click_ad_time_other(self, show):
-        self._hide_ad_time_inputs(not show)
+    def _click_other(self, inp, show):
+        inp.setVisible(show)
         if show:
-            inp = self._ad_time_inputs.itemAt(0).widget()
-            inp.setFocus(QtCore.Qt.OtherFocusReason)
-
-    def _hide_ad_time_inputs(self, value=True):
-        for idx in range(self._ad_time_inputs.count()):
-            self._ad_time_inputs.itemAt(idx).widget().setVisible(not value)
+            inp.setFocus(_FOCUS_OTHER)
 
     def _set_players_layout(self):
         self.players_layout = QtWidgets.QHBoxLayout()
-        self._player_layouts = []
-
-        players = [
-            'First player (black)',
-            'Second player (grey)',
-            'Third player (white)'
-        ]
+        self._player_groups = []
 
-        for player in players:
+        for player in self._PLAYER_TITLES:
             self._sel_layout_new = QtWidgets.QVBoxLayout()
+            group = QtWidgets.QButtonGroup(self)
 
-            for state in self.PLAYER_STATES.keys():
-                self._sel_layout_new.addWidget(QtWidgets.QRadioButton(state))
+            for index, state in enumerate(self.PLAYER_STATES.keys()):
+                radio = QtWidgets.QRadioButton(state)
+                group.addButton(radio, index)
+                self._sel_layout_new.addWidget(radio)
 
-            self._sel_layout_new.itemAt(0).widget().setChecked(True)
-            self._player_layouts.append(self._sel_layout_new)
+            group.button(0).setChecked(True)
+            self._player_groups.append(group)
 
             self._selector_new = QtWidgets.QGroupBox()
             self._selector_new.setTitle(player)
@@ -1005,6 +1055,26 @@ class StartGameWindow(QtWidgets.QDialog):
 
             self.players_layout.addWidget(self._selector_new)
 
+    def _show_error(self, title, text):
+        """Сообщение об ошибке в одном переиспользуемом окне"""
+        if self._error_box is None:
+            self._error_box = QtWidgets.QMessageBox(
+                QtWidgets.QMessageBox.Critical, '', '',
+                QtWidgets.QMessageBox.Ok, self)
+        self._error_box.setWindowTitle(title)
+        self._error_box.setText(text)
+        self._error_box.exec_()
+
+    @staticmethod
+    def _checked_id(group):
+        """Выбранный вариант, до показа окна — вариант по умолчанию"""
+        return 0 if group is None else group.checkedId()
+
+    @staticmethod
+    def _chosen_value(combo, options):
+        """Выбранное значение, None — если выбран ввод своего значения"""
+        return options[0][1] if combo is None else combo.currentData()
+
     def set_size(self):
         def convert(params):
             try:
@@ -1012,20 +1082,17 @@ class StartGameWindow(QtWidgets.QDialog):
                 if int(size[1]) >= 4 and int(size[0]) >= 4:
                     return int(size[0]), int(size[1])
                 else:
-                    QtWidgets.QMessageBox.critical(
-                        self, 'Field size', 'Wrong field size!')
+                    self._show_error('Field size', 'Wrong field size!')
 
             except (IndexError, ValueError):
-                QtWidgets.QMessageBox.critical(
-                    self, 'Field size', 'Wrong format!')
+                self._show_error('Field size', 'Wrong format!')
             return 0
 
-        if self._other.isChecked():
-            return convert(self._inputs.itemAt(0).widget().text())
+        index = self._checked_id(self._size_group)
+        if index < len(self._SIZES):
+            return self._SIZES[index]
 
-        for i in range(self._size_sel_layout.count() - 1):
-            if self._size_sel_layout.itemAt(i).widget().isChecked():
-                return convert(self._size_sel_layout.itemAt(i).widget().text())
+        return convert(self._size_input.text())
 
     def set_time(self):
         def convert(game_time):
@@ -1034,24 +1101,17 @@ class StartGameWindow(QtWidgets.QDialog):
                     start_time = float(game_time) * 60000
                     return [start_time, start_time, start_time]
                 else:
-                    QtWidgets.QMessageBox.critical(
-                        self, 'Game time', 'Wrong time!')
+                    self._show_error('Game time', 'Wrong time!')
 
             except ValueError:
-                QtWidgets.QMessageBox.critical(
-                    self, 'Game time', 'Wrong format!')
+                self._show_error('Game time', 'Wrong format!')
             return []
 
-        if self._time_other.isChecked():
-            return convert(self._time_inputs.itemAt(0).widget().text())
+        start_time = self._chosen_value(self._time_combo, self._TIMES)
+        if start_time is not None:
+            return [start_time, start_time, start_time] if start_time else []
 
-        if self._time_sel_layout.itemAt(0).widget().isChecked():
-            return []
-
-        for i in range(1, self._time_sel_layout.count() - 1):
-            if self._time_sel_layout.itemAt(i).widget().isChecked():
-                return convert(self._time_sel_layout.itemAt(i).widget().text().
-                               split(' ')[0])
+        return convert(self._time_input.text())
 
     def set_additional_time(self):
         def convert(additional_time):
@@ -1059,39 +1119,31 @@ class StartGameWindow(QtWidgets.QDialog):
                 if float(additional_time) >= 0:
                     return float(additional_time) * 1000
                 else:
-                    QtWidgets.QMessageBox.critical(
-                        self, 'Game time', 'Wrong time!')
+                    self._show_error('Game time', 'Wrong time!')
 
             except ValueError:
-                QtWidgets.QMessageBox.critical(
-                    self, 'Game time', 'Wrong format!')
+                self._show_error('Game time', 'Wrong format!')
             return 0
 
-        if self._ad_time_other.isChecked():
-            return convert(self._ad_time_inputs.itemAt(0).widget().text())
+        additional_time = self._chosen_value(
+            self._ad_time_combo, self._ADDITIONS)
+        if additional_time is not None:
+            return additional_time
 
-        for i in range(0, self._ad_time_sel_layout.count() - 1):
-            if self._ad_time_sel_layout.itemAt(i).widget().isChecked():
-                return convert(
-                    self._ad_time_sel_layout.itemAt(i).widget().text().
-                    split(' ')[0])
+        return convert(self._ad_time_input.text())
 
     def set_players(self):
-        chosen_players = []
-        for layout in self._player_layouts:
-            for i in range(layout.count()):
-                if layout.itemAt(i).widget().isChecked():
-                    chosen_players.append(
-                        self.PLAYER_STATES[layout.itemAt(i).widget().text()])
+        chosen_players = [
+            self._PLAYER_STATE_VALUES[self._checked_id(group)]
+            for group in self._player_groups]
 
         if players.RealPlayer not in chosen_players:
-            QtWidgets.QMessageBox.critical(
-                self, 'Players', 'At least one of the players should be real!')
+            self._show_error(
+                'Players', 'At least one of the players should be real!')
             return []
 
         if chosen_players.count(None) > 1:
-            QtWidgets.QMessageBox.critical(
-                self, 'Players', 'At least two players should play!')
+            self._show_error('Players', 'At least two players should play!')
             return []
 
         return chosen_players
@@ -1101,8 +1153,25 @@ def convert_game_to_graph_coords(game_coords):
     return (game_coords[0] + 1) * 30, (game_coords[1] + 1) * 30
 
 
+def stone_rect(graph_coords):
+    (x, y) = graph_coords
+    return QtCore.QRect(x - 15, y - 15, 31, 31)
+
+
 def convert_graph_to_game_coords(graph_coords):
-    return int(graph_coords[0] / 30 - 1), int(graph_coords[1] / 30 - 1)
+    return graph_coords[0] // 30 - 1, graph_coords[1] // 30 - 1
+
+
+def dump_json(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def load_json(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
 
 
 def time_to_str(time):
@@ -1119,17 +1188,22 @@ def parse_args():
         '-l', '--log', type=str,
         metavar='FILENAME', default='go.log', help='log filename')
 
+    parser.add_argument(
+        '-d', '--debug', action='store_true',
+        help='write game events to the log, not only errors')
+
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
-    log = logging.FileHandler(args.log)
-    log.setFormatter(logging.Formatter(
-        '%(asctime)s [%(levelname)s <%(name)s>] %(message)s'))
+    log_file = logging.FileHandler(args.log)
+    log_file.setFormatter(LOG_FORMATTER)
+    log = logging.handlers.MemoryHandler(
+        1024, flushLevel=logging.ERROR, target=log_file)
 
     logger = logging.getLogger(sys.modules[__name__].LOGGER_NAME)
-    logger.setLevel(logging.DEBUG if args.log else logging.ERROR)
+    logger.setLevel(logging.DEBUG if args.debug else logging.ERROR)
     logger.addHandler(log)
 
     LOGGER.info('GUI Application started')
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import tempfile
 import unittest
 import multiprocessing
 
@@ -9,6 +10,7 @@ sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
                              os.path.pardir))
 from GoGame.game import Goban, GameState
 from GoGame.players import RealPlayer, SimpleVirtualPlayer, CleverVirtualPlayer
+from GoGame.scoreboard import Scoreboard
 
 
 class GobanTest(unittest.TestCase):
@@ -47,18 +49,52 @@ class GobanTest(unittest.TestCase):
         for point in ((-1, 4), (1, -4), (-1, -4), (10, 4), (1, 10), (10, 10)):
             self.assertFalse(goban.check_coordinates(point))
 
+    def test_point_to_bit(self):
+        goban = Goban((3, 2))
+
+        self.assertEqual(goban.point_to_bit((0, 1)), 3)
+        self.assertEqual(goban.bit_to_point(5), (2, 1))
+
+        for point in ((3, 0), (-1, 0), (0, 2), (0, -1), (1, 1, 1)):
+            with self.assertRaises(ValueError):
+                goban.point_to_bit(point)
+
     def test_neighbour_points(self):
         goban = Goban((4, 4))
 
         with self.assertRaises(ValueError):
             set(goban.neighbour_points((1, 1, 1)))
 
+        with self.assertRaises(ValueError):
+            set(goban.neighbour_points((4, 0)))
+
         for (point, neighbours) in (((0, 0), {(0, 1), (1, 0)}),
                                     ((0, 1), {(0, 0), (0, 2), (1, 1)}),
                                     ((1, 1), {(0, 1), (1, 0), (1, 2),
                                               (2, 1)})):
             self.assertSetEqual(neighbours, set(goban.neighbour_points(point)))
 
+        self.assertSetEqual({(0, 1), (1, 0)},
+                            set(goban.neighbour_points(('0', '0'))))
+
+    def test_expand(self):
+        goban = Goban((3, 2))
+
+        for (point, neighbours) in (((0, 0), {(0, 1), (1, 0)}),
+                                    ((2, 0), {(1, 0), (2, 1)}),
+                                    ((1, 1), {(0, 1), (1, 0), (2, 1)})):
+            mask = goban.expand(1 << goban.point_to_bit(point))
+            self.assertSetEqual(neighbours, set(goban.mask_to_points(mask)))
+
+    def test_expand_next(self):
+        goban = Goban((3, 3))
+
+        for point in ((0, 0), (0, 1), (1, 1), (2, 2)):
+            mask = goban.expand_next(1 << goban.point_to_bit(point))
+            self.assertSetEqual(
+                set(goban.get_next_points(point)) | {point},
+                set(goban.mask_to_points(mask)))
+
     def test_get_next_points(self):
         goban = Goban((3, 3))
 
@@ -74,33 +110,78 @@ class GobanTest(unittest.TestCase):
             self.assertSetEqual(neighbours, set(goban.get_next_points(point)))
 
 
-class GameStateTest(unittest.TestCase):
+class SmallGobanTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.small_goban = Goban((2, 2))
+
+
+class GameStateTest(SmallGobanTestCase):
     def test_init_state(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
         for point in ((0, 0), (1, 0), (0, 1), (1, 1)):
-            self.assertEqual(GameState.FREE, state._state[point])
+            self.assertEqual(GameState.FREE, state.get_state(point))
 
     def test_init_error(self):
         with self.assertRaises(TypeError):
             GameState([])
 
     def test_get_state(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
         self.assertEqual(state.get_state((1, 1)), GameState.FREE)
 
-        state._state[(1, 1)] = GameState.WHITE
+        state.set_state((1, 1), GameState.WHITE)
         self.assertEqual(state.get_state((1, 1)), GameState.WHITE)
 
+    def test_get_state_off_board(self):
+        state = GameState(Goban((3, 3)))
+        state.set_state((2, 2), GameState.WHITE)
+
+        for point in ((-1, 0), (3, 0), (0, 3), (0, -1)):
+            self.assertEqual(state.get_state(point), GameState.FREE)
+
     def test_get_full_state(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         state.set_state((1, 1), GameState.WHITE)
 
-        self.assertDictEqual(state.get_full_state(), state._state)
+        self.assertDictEqual(state.get_full_state(), {
+            (0, 0): GameState.FREE,
+            (1, 0): GameState.FREE,
+            (0, 1): GameState.FREE,
+            (1, 1): GameState.WHITE
+        })
+
+    def test_speculative(self):
+        string = '''
+        X..
+        ...
+        '''
+        state = GameState.convert_string_to_state(string, '\n        ')
+        self.assertEqual(state.count_liberties((0, 0)), 2)
+
+        with state.speculative():
+            state.set_state((1, 0), GameState.WHITE)
+            self.assertEqual(state.count_liberties((0, 0)), 1)
+
+        self.assertEqual(state.get_state((1, 0)), GameState.FREE)
+        self.assertEqual(state.count_liberties((0, 0)), 2)
+        self.assertEqual(state.convert_state_to_string(), 'X..;...;')
+
+    def test_restore_from_other_state(self):
+        loaded = GameState.convert_string_to_state('X.O;.#.;', ';')
+        state = GameState(Goban((3, 2)))
+        state.restore(loaded.snapshot())
+
+        self.assertEqual(state.convert_state_to_string(), 'X.O;.#.;')
+        self.assertEqual(state.get_stones_mask(GameState.WHITE),
+                         1 << state.goban.point_to_bit((2, 0)))
+        self.assertEqual(state.get_free_points(),
+                         {(1, 0), (0, 1), (2, 1)})
 
     def test_get_goban_size(self):
         goban = Goban((3, 3))
@@ -109,7 +190,7 @@ class GameStateTest(unittest.TestCase):
         self.assertEqual(state.get_goban_size(), 3)
 
     def test_get_turn(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
         self.assertEqual(state._turn, GameState.BLACK)
@@ -121,14 +202,14 @@ class GameStateTest(unittest.TestCase):
         self.assertEqual(state._turn, GameState.BLACK)
 
     def test_set_turn(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         state.set_turn(GameState.WHITE)
 
         self.assertEqual(state.get_turn(), GameState.WHITE)
 
     def test_score(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
         self.assertEqual(state._score, {1: 0, 2: 0, 3: 0})
@@ -142,7 +223,7 @@ class GameStateTest(unittest.TestCase):
         self.assertEqual(state._score, {1: 2, 2: 3, 3: 4})
 
     def test_set_score(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         state.set_score(GameState.WHITE, 5)
         state.set_score(GameState.BLACK, 2)
@@ -150,7 +231,7 @@ class GameStateTest(unittest.TestCase):
         self.assertEqual(state.get_score(), {1: 2, 2: 0, 3: 5})
 
     def test_move(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
         state.make_move((1, 1))
@@ -205,6 +286,11 @@ class GameStateTest(unittest.TestCase):
         state = GameState.convert_string_to_state(string, '\n        ')
         self.assertEqual(state.count_liberties((0, 0)), 4)
 
+        state.set_state((0, 2), GameState.WHITE)
+        self.assertEqual(state.count_liberties((1, 1)), 3)
+        state.set_state((0, 2), GameState.FREE)
+        self.assertEqual(state.count_liberties((0, 1)), 4)
+
     def test_take_stones(self):
         string = '''
         OX...
@@ -216,6 +302,26 @@ class GameStateTest(unittest.TestCase):
 
         self.assertEqual(state.take_stones((0, 0)), 2)
 
+    def test_take_stones_in_neighbour_order(self):
+        state = GameState.convert_string_to_state('XX#;O..;', ';')
+        state.set_turn(GameState.GREY)
+
+        self.assertEqual(state.make_move((1, 1)), 1)
+        self.assertEqual(state.convert_state_to_string(), 'XX#;.#.;')
+        self.assertEqual(state.get_score()[GameState.GREY], 1)
+
+    def test_has_enemy_neighbours(self):
+        string = '''
+        X.O
+        ...
+        '''
+        state = GameState.convert_string_to_state(string, '\n        ')
+
+        self.assertTrue(state.has_enemy_neighbours((1, 0), GameState.BLACK))
+        self.assertFalse(state.has_enemy_neighbours((0, 1), GameState.BLACK))
+        self.assertFalse(state.has_enemy_neighbours((1, 1), GameState.BLACK))
+        self.assertTrue(state.has_enemy_neighbours((0, 1), GameState.GREY))
+
     def test_take_territory(self):
         string = '''
         .X...
@@ -258,11 +364,22 @@ class GameStateTest(unittest.TestCase):
         self.assertEqual(group, {(0, 0), (0, 1), (1, 0)})
         self.assertEqual(boarder, {(0, 2), (1, 1), (2, 0)})
 
+        string = '''
+        ..X
+        X.X
+        X..
+        '''
+        state = GameState.convert_string_to_state(string, '\n        ')
+        group, boarder = state.get_group((2, 0))
+
+        self.assertEqual(group, {(2, 0), (2, 1)})
+        self.assertEqual(boarder, {(1, 0), (1, 1), (2, 2)})
+
     def test_catch_group(self):
         goban = Goban((5, 5))
         state = GameState(goban)
 
-        state._state[(1, 1)] = GameState.BLACK
+        state.set_state((1, 1), GameState.BLACK)
         self.assertEqual(state.catch_group((1, 1)), 1)
         self.assertEqual(state.get_state((1, 1)), GameState.FREE)
 
@@ -281,17 +398,47 @@ class GameStateTest(unittest.TestCase):
                 self.assertEqual(state.get_state((x, y)), GameState.FREE)
 
     def test_get_free_points(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
         self.assertSetEqual(state.get_free_points(),
                             {(0, 0), (0, 1), (1, 0), (1, 1)})
-        state._state[(0, 0)] = GameState.BLACK
+        state.set_state((0, 0), GameState.BLACK)
         self.assertSetEqual(state.get_free_points(),
                             {(0, 1), (1, 0), (1, 1)})
 
+    def test_get_stones_mask(self):
+        string = '''
+        X.O
+        .XX
+        '''
+        state = GameState.convert_string_to_state(string, '\n        ')
+        goban = state.goban
+
+        self.assertSetEqual(
+            set(goban.mask_to_points(state.get_stones_mask(GameState.BLACK))),
+            {(0, 0), (1, 1), (2, 1)})
+        self.assertEqual(state.get_stones_mask(GameState.WHITE),
+                         1 << goban.point_to_bit((2, 0)))
+        self.assertEqual(state.get_stones_mask(GameState.GREY), 0)
+
+    def test_get_legal_points(self):
+        string = '''
+        .X.O
+        XX.O
+        ..OO
+        O...
+        '''
+        state = GameState.convert_string_to_state(string, '\n        ')
+        points = {(2, 0), (2, 1), (0, 2), (1, 2), (1, 3), (2, 3), (3, 3)}
+
+        self.assertSetEqual(state.get_legal_points(GameState.BLACK),
+                            points | {(0, 0)})
+        self.assertSetEqual(state.get_legal_points(GameState.GREY), points)
+        self.assertSetEqual(state.get_legal_points(GameState.WHITE), points)
+
     def test_get_winner(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         state._score = {
             GameState.BLACK: 0,
@@ -318,22 +465,26 @@ class GameStateTest(unittest.TestCase):
         self.assertEqual(state.get_winner(), [GameState.WHITE])
 
     def test_convert_state_to_string(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
-        state._state[(0, 0)] = GameState.BLACK
-        state._state[(1, 0)] = GameState.GREY
-        state._state[(0, 1)] = GameState.WHITE
+        state.set_state((0, 0), GameState.BLACK)
+        state.set_state((1, 0), GameState.GREY)
+        state.set_state((0, 1), GameState.WHITE)
 
         self.assertEqual(state.convert_state_to_string(), 'X#;O.;')
 
+        string = 'X#..O;.O.X.;'
+        state = GameState.convert_string_to_state(string, ';')
+        self.assertEqual(state.convert_state_to_string(), string)
+
     def test_convert_string_to_state(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
 
-        state._state[(0, 0)] = GameState.BLACK
-        state._state[(1, 0)] = GameState.GREY
-        state._state[(0, 1)] = GameState.WHITE
+        state.set_state((0, 0), GameState.BLACK)
+        state.set_state((1, 0), GameState.GREY)
+        state.set_state((0, 1), GameState.WHITE)
 
         first_string = '''
         X#
@@ -344,39 +495,54 @@ class GameStateTest(unittest.TestCase):
         second_string = 'X#;O.;'
         second_state = state.convert_string_to_state(second_string, ';')
 
-        self.assertDictEqual(first_state._state, state._state)
-        self.assertDictEqual(second_state._state, state._state)
+        self.assertDictEqual(first_state.get_full_state(),
+                             state.get_full_state())
+        self.assertDictEqual(second_state.get_full_state(),
+                             state.get_full_state())
 
+        for string in ('X#;O;', 'X#;Oa;', 'XX;X;XXX;'):
+            with self.assertRaises(ValueError):
+                state.convert_string_to_state(string, ';')
+
+    def test_convert_same_string_twice(self):
+        first_state = GameState.convert_string_to_state('X.;..;', ';')
+        first_state.make_move((1, 1))
+
+        second_state = GameState.convert_string_to_state('X.;..;', ';')
+        self.assertEqual(second_state.convert_state_to_string(), 'X.;..;')
+        self.assertEqual(second_state.get_free_points(),
+                         {(1, 0), (0, 1), (1, 1)})
 
-class RealPlayerTest(unittest.TestCase):
+
+class RealPlayerTest(SmallGobanTestCase):
     def test_init_player(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         player = RealPlayer(state.BLACK)
 
         self.assertEqual(player.get_colour(), state.BLACK)
 
 
-class VirtualPlayerTest(unittest.TestCase):
+class VirtualPlayerTest(SmallGobanTestCase):
     def test_init_player(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         player = SimpleVirtualPlayer(state.GREY)
 
         self.assertEqual(player.get_colour(), state.GREY)
 
     def test_try_make_move(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         player = SimpleVirtualPlayer(state.GREY)
 
-        state._turn = state.GREY
+        state.set_turn(state.GREY)
         move = player.try_make_move(state, 60)
         self.assertEqual(move[0], True)
         self.assertTrue(move[1] in [(0, 0), (1, 0), (0, 1), (1, 1)])
 
-        state._turn = state.GREY
-        state._state[(0, 0)] = GameState.BLACK
+        state.set_turn(state.GREY)
+        state.set_state((0, 0), GameState.BLACK)
         move = player.try_make_move(state, 60)
         self.assertEqual(move[0], True)
         self.assertTrue(move[1] in [(0, 1), (1, 0), (1, 1)])
@@ -386,14 +552,22 @@ class VirtualPlayerTest(unittest.TestCase):
         XX
         '''
         state = GameState.convert_string_to_state(string, '\n        ')
-        state._turn = state.GREY
+        state.set_turn(state.GREY)
 
         self.assertEqual(player.try_make_move(state, 60), (False, None, 0))
 
+    def test_find_point_for_current_turn(self):
+        state = GameState.convert_string_to_state('X.;.X;', ';')
+        state.set_turn(state.GREY)
+        player = SimpleVirtualPlayer(state.BLACK)
+
+        self.assertEqual(player.find_point_to_move(state, None),
+                         (False, None, 0))
 
-class CleverVirtualPlayerTest(unittest.TestCase):
+
+class CleverVirtualPlayerTest(SmallGobanTestCase):
     def test_init_player(self):
-        goban = Goban((2, 2))
+        goban = self.small_goban
         state = GameState(goban)
         player = CleverVirtualPlayer(state.GREY)
 
@@ -404,7 +578,7 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         state = GameState(goban)
         player = CleverVirtualPlayer(state.GREY)
 
-        state._turn = state.GREY
+        state.set_turn(state.GREY)
         points = state.get_free_points()
         move = player.try_make_move(state, 60)
         self.assertEqual(move[0], True)
@@ -416,7 +590,7 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         ...
         '''
         state = GameState.convert_string_to_state(string, '\n        ')
-        state._turn = state.GREY
+        state.set_turn(state.GREY)
         move = player.try_make_move(state, 60)
 
         self.assertEqual(move[0], True)
@@ -428,7 +602,7 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         .O.
         '''
         state = GameState.convert_string_to_state(string, '\n        ')
-        state._turn = state.GREY
+        state.set_turn(state.GREY)
 
         self.assertEqual(player.try_make_move(state, 60), (False, None, 0))
 
@@ -440,7 +614,7 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         '''
         state = GameState.convert_string_to_state(string, '\n        ')
         player = CleverVirtualPlayer(state.WHITE)
-        state._turn = state.WHITE
+        state.set_turn(state.WHITE)
 
         self.assertEqual(player.try_make_move(state, 60), (True, (1, 2), 0))
 
@@ -451,7 +625,7 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         '''
         state = GameState.convert_string_to_state(string, '\n        ')
         player = CleverVirtualPlayer(state.WHITE)
-        state._turn = state.WHITE
+        state.set_turn(state.WHITE)
 
         self.assertEqual(player.try_make_move(state, 60), (True, (2, 1), 0))
 
@@ -463,7 +637,7 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         '''
         state = GameState.convert_string_to_state(string, '\n        ')
         player = CleverVirtualPlayer(state.GREY)
-        state._turn = state.GREY
+        state.set_turn(state.GREY)
 
         self.assertEqual(player.try_make_move(state, 60), (True, (0, 2), 1))
 
@@ -476,7 +650,7 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         '''
         state = GameState.convert_string_to_state(string, '\n        ')
         player = CleverVirtualPlayer(state.GREY)
-        state._turn = state.GREY
+        state.set_turn(state.GREY)
 
         move = player.try_make_move(state, 60)[1]
         self.assertTrue(move in [(2, 0), (3, 1), (2, 3), (1, 2)])
@@ -503,12 +677,57 @@ class CleverVirtualPlayerTest(unittest.TestCase):
         self.assertEqual(player.check_moves_to_take_stones(state, (2, 0)), 2)
 
     def test_find_point_with_lack_of_time(self):
-        goban = Goban((100, 100))
+        goban = Goban((40, 40))
         state = GameState(goban)
         player = CleverVirtualPlayer(state.BLACK)
 
         with self.assertRaises(multiprocessing.TimeoutError):
-            player.find_point_to_move(state, 0.01)
+            player.find_point_to_move(state, 0.001)
+
+
+class ScoreboardTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self._dir.name, 'scores.dat')
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def write(self, text):
+        with open(self.filename, 'w') as f:
+            f.write(text)
+
+    def test_skip_broken_legacy_line(self):
+        self.write('{"11": [["Ann", 5]]}\n'
+                   '{"11": [["Bob", \n'
+                   '{"15": [["Eve", 7], ["Max", 0]]}\n')
+
+        with self.assertLogs('go', 'WARNING'):
+            scoreboard = Scoreboard(self.filename)
+
+        self.assertListEqual(scoreboard.get_scores(11), [('Ann', 5)])
+        self.assertListEqual(scoreboard.get_scores(15), [('Eve', 7)])
+
+    def test_skip_truncated_last_line(self):
+        self.write('{"_v": 1}\n'
+                   '["11", "Ann", 5]\n'
+                   '7\n'
+                   '["11", "Bob"]\n'
+                   '["11", "Eve", 3]\n'
+                   '["11", "Ma')
+
+        with self.assertLogs('go', 'WARNING'):
+            scoreboard = Scoreboard(self.filename)
+
+        self.assertListEqual(scoreboard.get_scores(11),
+                             [('Ann', 5), ('Eve', 3)])
+
+        scoreboard.add_score(11, 'Max', 4)
+        with self.assertLogs('go', 'WARNING'):
+            scoreboard = Scoreboard(self.filename)
+
+        self.assertListEqual(scoreboard.get_scores(11),
+                             [('Ann', 5), ('Max', 4), ('Eve', 3)])
 
 
 if __name__ == '__main__':